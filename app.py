@@ -10,16 +10,24 @@ ENV:
 - PORT (optional, default 8080)
 """
 import os
+import asyncio
 import logging
 import time
+import threading
 import re
 import json
 import urllib.parse
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
 from zoneinfo import ZoneInfo
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest, RetryAfter
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -28,13 +36,15 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, PickleType, DateTime, inspect, text
+from sqlalchemy import create_engine, select, update, delete, func, event, Column, Integer, String, Boolean, JSON, DateTime, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.mutable import MutableDict, MutableList
 
 # ------------------ Logging ------------------
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+# LOG_LEVEL=WARNING in production skips formatting the per-update records
+logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # ------------------ Config ------------------
@@ -47,34 +57,95 @@ if not BOT_TOKEN:
     raise SystemExit(1)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+if DATABASE_URL:
+    # Render hands out postgres:// URLs; route both spellings to the psycopg
+    # v3 driver (faster than psycopg2, supports pipelining)
+    if DATABASE_URL.startswith("postgres://"):
+        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg://", 1)
+    elif DATABASE_URL.startswith("postgresql://"):
+        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 if not DATABASE_URL:
     DATABASE_URL = "sqlite:///bot_rules.db"
 
 # Use Asia/Kolkata timezone for schedules
 KOLKATA_TZ = ZoneInfo("Asia/Kolkata")
 
-Engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
+# All three values are fixed for the process lifetime
+GLOBAL_INFO_TEXT = f"Admin: {FORCE_ADMIN_ID}\nDB: {DATABASE_URL}\nTZ: Asia/Kolkata"
+
+if DATABASE_URL.startswith("sqlite"):
+    Engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+    @event.listens_for(Engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # WAL lets readers run during writes; synchronous=NORMAL halves the
+        # fsyncs per commit, which dominates rule-edit latency on sqlite
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
+else:
+    # Postgres: keep a warm connection pool instead of paying TCP+auth per
+    # session. LIFO reuse keeps the hottest connection cached server-side;
+    # recycle guards against the provider dropping idle connections.
+    Engine = create_engine(
+        DATABASE_URL,
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        # psycopg's default promotes a statement to server-side prepared after
+        # 5 runs; with only a dozen distinct statements here, prepare on the
+        # first repeat so menu queries skip reparsing from the second click on
+        connect_args={"prepare_threshold": 1},
+    )
 Base = declarative_base()
-Session = sessionmaker(bind=Engine)
+# expire_on_commit=False keeps committed objects readable (summaries, cached
+# rules) without a refresh round-trip after every commit. Deliberately not a
+# scoped_session: handlers and cache rebuilds nest independent short-lived
+# sessions, which a thread-scoped registry would collapse into one.
+Session = sessionmaker(bind=Engine, expire_on_commit=False)
+
+
+@contextmanager
+def db_session():
+    """Short-lived session with guaranteed close (and rollback on error)."""
+    session = Session()
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 # ------------------ DB Models ------------------
+# On Postgres the JSONB variant stores the parsed binary form (indexable, no
+# re-parse on read); sqlite keeps plain JSON text. A fresh instance per column:
+# as_mutable() tags the type instance, so it can't be shared between columns.
+def _json_column_type():
+    return JSON().with_variant(JSONB(), "postgresql")
+
+
 class ForwardRule(Base):
     __tablename__ = "forward_rules"
     id = Column(Integer, primary_key=True)
     name = Column(String, default="unnamed_rule")
-    source_chat_id = Column(String, nullable=False)    # e.g. -100123... or @channel
+    source_chat_id = Column(String, nullable=False, index=True)    # e.g. -100123... or @channel
     destination_chat_id = Column(String, nullable=False)
 
     is_active = Column(Boolean, default=True)
     block_links = Column(Boolean, default=False)
     block_usernames = Column(Boolean, default=False)
 
-    # Use Mutable containers so sqlalchemy tracks in-place changes
-    blacklist_words = Column(MutableList.as_mutable(PickleType), default=list)     # list[str]
-    whitelist_words = Column(MutableList.as_mutable(PickleType), default=list)     # list[str]
-    text_replacements = Column(MutableDict.as_mutable(PickleType), default=dict)   # dict{find: replace}
+    # Use Mutable containers so sqlalchemy tracks in-place changes.
+    # JSON instead of PickleType: decodes via C json without pickle opcodes.
+    blacklist_words = Column(MutableList.as_mutable(_json_column_type()), default=list)     # list[str]
+    whitelist_words = Column(MutableList.as_mutable(_json_column_type()), default=list)     # list[str]
+    text_replacements = Column(MutableDict.as_mutable(_json_column_type()), default=dict)   # dict{find: replace}
 
     header_text = Column(String, nullable=True)
     footer_text = Column(String, nullable=True)
@@ -95,6 +166,12 @@ class MetaConfig(Base):
     admin_user_id = Column(Integer, default=FORCE_ADMIN_ID)
 
 
+# Prepared once at import: the hot-path query for active rules. ForwardRule has
+# no relationships and no deferred columns, so a single scalars() execution
+# loads everything the forwarding loop needs in one round-trip.
+ACTIVE_RULES_STMT = select(ForwardRule).where(ForwardRule.is_active == True)  # noqa: E712
+
+
 # ------------------ Auto DB-fix helper ------------------
 def ensure_tables_and_columns():
     """
@@ -114,6 +191,15 @@ def ensure_tables_and_columns():
     existing_cols = {col["name"] for col in inspector.get_columns("forward_rules")}
     logger.info(f"Existing forward_rules columns: {existing_cols}")
 
+    # index on the lookup column for pre-existing databases (create_all only
+    # builds indexes together with new tables)
+    try:
+        with Engine.connect() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_forward_rules_source_chat_id ON forward_rules (source_chat_id);"))
+            conn.commit()
+    except Exception as e:
+        logger.warning(f"Could not ensure source_chat_id index: {e}")
+
     # desired columns with SQL types per dialect
     dialect = Engine.dialect.name  # 'postgresql' or 'sqlite' etc.
     logger.info(f"DB dialect detected: {dialect}")
@@ -122,9 +208,9 @@ def ensure_tables_and_columns():
     expected_columns = {
         "header_text": ("TEXT", "TEXT"),
         "footer_text": ("TEXT", "TEXT"),
-        "text_replacements": ("BYTEA", "BLOB"),   # PickleType -> BYTEA (pg) / BLOB (sqlite)
-        "blacklist_words": ("BYTEA", "BLOB"),
-        "whitelist_words": ("BYTEA", "BLOB"),
+        "text_replacements": ("JSONB", "TEXT"),   # JSON -> JSONB (pg) / TEXT (sqlite)
+        "blacklist_words": ("JSONB", "TEXT"),
+        "whitelist_words": ("JSONB", "TEXT"),
         "forwarded_count": ("INTEGER", "INTEGER"),
         "last_triggered": ("TIMESTAMP", "DATETIME"),
     }
@@ -152,51 +238,345 @@ def ensure_tables_and_columns():
             logger.exception(f"Failed to add missing columns automatically: {e}")
             return
 
+def migrate_pickled_columns():
+    """
+    One-shot best-effort conversion of legacy pickled list/dict values to JSON,
+    so rows written before the PickleType -> JSON column change still load.
+
+    On Postgres the legacy schema created these columns as BYTEA; after the
+    blobs are rewritten as JSON text the columns themselves are flipped to
+    JSONB, otherwise the ORM's JSONB type can neither read nor write them.
+    """
+    import pickle
+    json_cols = ("blacklist_words", "whitelist_words", "text_replacements")
+    defaults = {"blacklist_words": "[]", "whitelist_words": "[]", "text_replacements": "{}"}
+
+    # legacy-pg detection: which of the three columns are still BYTEA
+    bytea_cols = []
+    if Engine.dialect.name == "postgresql":
+        col_types = {c["name"]: str(c["type"]).upper() for c in inspect(Engine).get_columns("forward_rules")}
+        bytea_cols = [c for c in json_cols if col_types.get(c, "").startswith("BYTEA")]
+
+    with Engine.connect() as conn:
+        rows = conn.execute(text(f'SELECT id, {", ".join(json_cols)} FROM forward_rules')).fetchall()
+        for row in rows:
+            rid, values = row[0], row[1:]
+            updates = {}
+            for col, val in zip(json_cols, values):
+                if isinstance(val, (bytes, memoryview)):
+                    try:
+                        decoded = json.dumps(pickle.loads(bytes(val)))
+                    except Exception:
+                        if col in bytea_cols:
+                            # the blob is unusable either way and would make the
+                            # ALTER below fail; fall back to the empty default
+                            logger.warning(f"Could not convert pickled {col} for rule {rid}; resetting to default.")
+                            decoded = defaults[col]
+                        else:
+                            logger.warning(f"Could not convert pickled {col} for rule {rid}; leaving as-is.")
+                            continue
+                    # BYTEA columns need a bytes parameter; TEXT/JSON take str
+                    updates[col] = decoded.encode("utf-8") if col in bytea_cols else decoded
+            if updates:
+                sets = ", ".join(f'"{c}" = :{c}' for c in updates)
+                conn.execute(text(f'UPDATE forward_rules SET {sets} WHERE id = :rid'), {**updates, "rid": rid})
+        conn.commit()
+
+        # flip the now-JSON-text legacy columns to JSONB in place
+        for col in bytea_cols:
+            logger.info(f"Converting legacy BYTEA column {col} to JSONB")
+            conn.execute(text(
+                f'ALTER TABLE forward_rules ALTER COLUMN "{col}" TYPE JSONB '
+                f"USING convert_from(\"{col}\", 'UTF8')::jsonb"
+            ))
+        if bytea_cols:
+            conn.commit()
+
 # Run schema ensure on startup
 try:
     ensure_tables_and_columns()
+    migrate_pickled_columns()
 except Exception as e:
     logger.exception(f"Auto DB-fix failed on startup: {e}")
 
+# ------------------ Rule cache versioning ------------------
+# Bumped on every committed write; rendered artifacts are memoized against it
+# so repeated menu renders between edits don't redo the formatting work.
+RULES_VERSION = 0
+_summary_cache = {}
+
+
+def bump_rules_version():
+    global RULES_VERSION
+    RULES_VERSION += 1
+    _summary_cache.clear()
+    _render_cache.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("stats_only", None):
+        # Forward counters changed but matching/filter config didn't;
+        # refresh rendered summaries without rebuilding the rules cache.
+        _summary_cache.clear()
+        return
+    bump_rules_version()
+
+
+# Active rules as RuleView snapshots, reused across messages.
+# Rebuilt lazily whenever RULES_VERSION moves (i.e. after any rule edit).
+_rules_cache: Optional[List["RuleView"]] = None
+_rules_cache_version = -1
+# source index over the cached rules: exact ids and @usernames hash straight
+# to their rules; only legacy "contains" sources still need a linear check.
+# One tuple (by_id, by_uname, fuzzy) so readers grab a consistent snapshot
+# with a single reference read.
+_rules_index: tuple = ({}, {}, [])
+# rebuilds can race (to_thread refresh vs. an event-loop reader hitting a
+# stale cache under concurrent_updates); serialize them and only ever swap
+# fully built containers so readers never see a half-populated index
+_rules_rebuild_lock = threading.Lock()
+
+
+def get_active_rules() -> List["RuleView"]:
+    global _rules_cache, _rules_cache_version, _rules_index
+    if _rules_cache is None or _rules_cache_version != RULES_VERSION:
+        with _rules_rebuild_lock:
+            # re-check: another builder may have finished while we waited
+            if _rules_cache is None or _rules_cache_version != RULES_VERSION:
+                version = RULES_VERSION
+                with db_session() as session:
+                    rules = [build_rule_view(r) for r in session.scalars(ACTIVE_RULES_STMT)]
+                by_id, by_uname, fuzzy = {}, {}, []
+                for rule in rules:
+                    if rule.src_kind == "id":
+                        by_id.setdefault(rule.src_key, []).append(rule)
+                    elif rule.src_kind == "uname":
+                        by_uname.setdefault(rule.src_key, []).append(rule)
+                    elif rule.src_kind == "contains":
+                        fuzzy.append(rule)
+                _rules_index = (by_id, by_uname, fuzzy)
+                _rules_cache = rules
+                _rules_cache_version = version
+    return _rules_cache
+
+
+async def refresh_rules_cache_async():
+    """Rebuild the rules cache off the event loop if it's stale."""
+    if _rules_cache is None or _rules_cache_version != RULES_VERSION:
+        await asyncio.to_thread(get_active_rules)
+
+
+def get_matching_rules(msg_chat_id: str, msg_uname: str) -> List["RuleView"]:
+    """Active rules whose source matches this chat, via the O(1) index."""
+    get_active_rules()  # refresh cache + index if stale
+    by_id, by_uname, fuzzy = _rules_index  # one read -> consistent snapshot
+    matched = list(by_id.get(msg_chat_id, ()))
+    if msg_uname:
+        matched.extend(by_uname.get(msg_uname, ()))
+    contains = SOURCE_MATCHERS["contains"]
+    for rule in fuzzy:
+        if contains(rule, msg_chat_id, msg_uname):
+            matched.append(rule)
+    return matched
+
+
+# (id, name) rows for the rules list view; same invalidation scheme. The
+# view renders nothing else, so don't hydrate full ORM rows with JSON columns.
+_all_rules_cache: Optional[list] = None
+_all_rules_cache_version = -1
+ALL_RULES_STMT = select(ForwardRule.id, ForwardRule.name)
+
+
+def get_all_rules() -> list:
+    global _all_rules_cache, _all_rules_cache_version
+    if _all_rules_cache is None or _all_rules_cache_version != RULES_VERSION:
+        version = RULES_VERSION
+        with db_session() as session:
+            rules = session.execute(ALL_RULES_STMT).all()
+        _all_rules_cache = rules
+        _all_rules_cache_version = version
+    return _all_rules_cache
+
+
 # ------------------ Helpers ------------------
+def _compile_word_regex(words) -> Optional[re.Pattern]:
+    """
+    One alternation pattern over all non-empty words, or None if empty.
+    Words are casefolded to match the casefolded message text, so stored
+    words with stray uppercase still match.
+    """
+    words = [w.casefold() for w in (words or ()) if w]
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)))
+
+
+@dataclass(slots=True)
+class RuleView:
+    """
+    Slotted snapshot of one active rule plus its precompiled filter
+    artifacts. The forwarding hot path works on these instead of ORM
+    instances: no identity-map/__dict__ overhead, and every derived value
+    (regexes, affixes, source classification) is computed exactly once at
+    cache build.
+    """
+    id: int
+    name: str
+    destination_chat_id: str
+    forward_mode: str
+    forward_delay: int
+    block_links: bool
+    block_usernames: bool
+    sched_start_min: Optional[int]
+    sched_end_min: Optional[int]
+    src_kind: Optional[str]
+    src_key: str
+    src_lower: str
+    bl_re: Optional[re.Pattern]
+    wl_re: Optional[re.Pattern]
+    repl_re: Optional[re.Pattern]
+    repl_map: dict
+    header_prefix: str
+    footer_suffix: str
+    forwarded_count: int
+    last_triggered: Optional[datetime]
+
+
+def _parse_hhmm(value: Optional[str]) -> Optional[int]:
+    """'HH:MM' -> minutes since midnight, or None when unset/unparsable."""
+    if not value:
+        return None
+    try:
+        hh, mm = value.split(":", 1)
+        return int(hh) * 60 + int(mm)
+    except (ValueError, AttributeError):
+        return None
+
+
+def build_rule_view(rule: ForwardRule) -> RuleView:
+    """
+    Precompute filter artifacts for a loaded rule. Word lists compile into a
+    single alternation regex each, so matching is one C-level scan of the
+    message instead of a Python loop over every word (substring semantics
+    preserved), and the source identifier is classified once so matching is
+    a single dispatch instead of repeated startswith/isdigit/lower calls.
+    """
+    replacements = {find: repl for find, repl in (rule.text_replacements or {}).items() if find}
+
+    src = rule.source_chat_id or ""
+    src_lower = ""
+    if not src:
+        src_kind, src_key = None, ""
+    elif src.startswith("@"):
+        src_kind, src_key = "uname", src.lower()
+    elif src.startswith("-100") or src.isdigit():
+        src_kind, src_key = "id", src
+    else:
+        src_kind, src_key = "contains", src
+        src_lower = src.lower()
+
+    return RuleView(
+        id=rule.id,
+        name=rule.name,
+        destination_chat_id=rule.destination_chat_id,
+        forward_mode=rule.forward_mode,
+        forward_delay=rule.forward_delay or 0,
+        block_links=bool(rule.block_links),
+        block_usernames=bool(rule.block_usernames),
+        sched_start_min=_parse_hhmm(rule.schedule_start),
+        sched_end_min=_parse_hhmm(rule.schedule_end),
+        src_kind=src_kind,
+        src_key=src_key,
+        src_lower=src_lower,
+        bl_re=_compile_word_regex(rule.blacklist_words),
+        wl_re=_compile_word_regex(rule.whitelist_words),
+        repl_re=re.compile("|".join(map(re.escape, replacements))) if replacements else None,
+        repl_map=replacements,
+        header_prefix=f"{rule.header_text}\n\n" if rule.header_text else "",
+        footer_suffix=f"\n\n{rule.footer_text}" if rule.footer_text else "",
+        forwarded_count=rule.forwarded_count or 0,
+        last_triggered=rule.last_triggered,
+    )
+
+
+SOURCE_MATCHERS = {
+    "id": lambda rule, chat_id, uname: chat_id == rule.src_key,
+    "uname": lambda rule, chat_id, uname: uname == rule.src_key,
+    "contains": lambda rule, chat_id, uname: chat_id in rule.src_key or (uname and uname in rule.src_lower),
+}
+
+
 def admin_check(user_id: Optional[int]) -> bool:
     """Only fixed admin allowed."""
     return user_id == FORCE_ADMIN_ID
 
+def _parse_word_list(raw, existing):
+    """Split comma/newline separated input into new lowercase words.
+
+    Lets a pasted list land as one commit instead of one UPDATE per word.
+    """
+    seen = set(existing)
+    words = []
+    for w in re.split(r"[\n,]+", raw):
+        w = w.lower().strip()
+        if w and w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words
+
 def safe_str_join(lst):
     try:
         return ", ".join(lst or [])
     except Exception:
         return "None"
 
+def _md_safe(value) -> str:
+    """Neutralize backticks in user-supplied text interpolated into the
+    backtick-quoted Markdown summaries; a stray ` would make Telegram
+    reject the whole edit ('can't parse entities')."""
+    return str(value).replace("`", "'")
+
 def format_rule_summary(rule: ForwardRule) -> str:
+    cached = _summary_cache.get(rule.id)
+    if cached is not None:
+        return cached
     start = rule.schedule_start or "Any"
     end = rule.schedule_end or "Any"
-    return (
-        f"Rule #{rule.id} — {rule.name}\n"
-        f"Source: `{rule.source_chat_id}` → Dest: `{rule.destination_chat_id}`\n"
+    summary = (
+        f"Rule #{rule.id} — `{_md_safe(rule.name)}`\n"
+        f"Source: `{_md_safe(rule.source_chat_id)}` → Dest: `{_md_safe(rule.destination_chat_id)}`\n"
         f"Active: `{rule.is_active}` | Mode: `{rule.forward_mode}` | Delay: `{rule.forward_delay}s`\n"
         f"LinksBlocked: `{rule.block_links}` | UsernamesBlocked: `{rule.block_usernames}`\n"
-        f"Blacklist: `{safe_str_join(rule.blacklist_words) or 'None'}` | Whitelist: `{safe_str_join(rule.whitelist_words) or 'None'}`\n"
-        f"Header: `{(rule.header_text[:40] + '...') if rule.header_text else 'None'}` | Footer: `{(rule.footer_text[:40] + '...') if rule.footer_text else 'None'}`\n"
+        f"Blacklist: `{_md_safe(safe_str_join(rule.blacklist_words) or 'None')}` | Whitelist: `{_md_safe(safe_str_join(rule.whitelist_words) or 'None')}`\n"
+        f"Header: `{_md_safe(rule.header_text[:40] + '...') if rule.header_text else 'None'}` | Footer: `{_md_safe(rule.footer_text[:40] + '...') if rule.footer_text else 'None'}`\n"
         f"Replacements: `{len(rule.text_replacements or {})} rules` | Schedule: `{start}-{end}`\n"
         f"Forwarded Count: `{rule.forwarded_count}`"
     )
+    _summary_cache[rule.id] = summary
+    return summary
 
 # ------------------ Keyboards ------------------
+# Static markups built once at import; InlineKeyboardMarkup is immutable so
+# sharing one instance across replies is safe.
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ New Rule", callback_data="new_rule")],
+    [InlineKeyboardButton("📜 List Rules", callback_data="list_rules")],
+    [InlineKeyboardButton("🔁 Refresh", callback_data="refresh")],
+    [InlineKeyboardButton("⚙️ Global Info", callback_data="global_info")],
+])
+CANCEL_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]])
+BACK_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="main")]])
+
 def main_menu_keyboard():
-    keyboard = [
-        [InlineKeyboardButton("➕ New Rule", callback_data="new_rule")],
-        [InlineKeyboardButton("📜 List Rules", callback_data="list_rules")],
-        [InlineKeyboardButton("🔁 Refresh", callback_data="refresh")],
-        [InlineKeyboardButton("⚙️ Global Info", callback_data="global_info")],
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    return MAIN_MENU_MARKUP
 
 def rule_action_keyboard(rule: ForwardRule):
-    rid = rule.id
+    return _rule_action_markup(rule.id, rule.is_active)
+
+def _rule_action_markup(rid, is_active):
     keyboard = [
-        [InlineKeyboardButton("▶️ Enable" if not rule.is_active else "⏸️ Disable", callback_data=f"toggle_active|{rid}")],
+        [InlineKeyboardButton("▶️ Enable" if not is_active else "⏸️ Disable", callback_data=f"toggle_active|{rid}")],
         [InlineKeyboardButton("✏️ Edit Name", callback_data=f"edit_name|{rid}"), InlineKeyboardButton("🗑 Delete", callback_data=f"delete_rule|{rid}")],
         [InlineKeyboardButton("🔧 Settings", callback_data=f"settings|{rid}")],
         [InlineKeyboardButton("📊 Stats", callback_data=f"stats|{rid}"), InlineKeyboardButton("🔁 Export", callback_data=f"export_rule|{rid}")],
@@ -231,6 +611,242 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(text, reply_markup=main_menu_keyboard())
 
 # ------------------ Callback Handler ------------------
+# Callback data is "action" or "action|<rule_id>[|<extra>]". One partition and
+# one dict lookup route every press; the old if/elif chain scanned up to ~20
+# startswith prefixes per click. All handlers share the same signature.
+
+# Hash of the last rendered (text, markup) per message. A redraw that would
+# produce the identical screen is skipped locally instead of paying the HTTPS
+# round trip for Telegram's "Message is not modified" rejection.
+_LAST_EDIT_HASH: OrderedDict = OrderedDict()
+_LAST_EDIT_MAX = 512
+
+async def edit_or_skip(query, text, reply_markup=None, parse_mode=None):
+    msg = query.message
+    key = (msg.chat_id, msg.message_id) if msg else None
+    h = None
+    if key is not None:
+        h = hashlib.blake2b((text + repr(reply_markup)).encode(), digest_size=8).digest()
+        if _LAST_EDIT_HASH.get(key) == h:
+            return
+    try:
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except BadRequest as e:
+        # backstop for hash-cache misses (restart, LRU eviction): treat the
+        # no-op edit as success so the hash below records the current screen.
+        # PTB keeps the API description's long tail, so match the prefix only
+        if not e.message.startswith("Message is not modified"):
+            raise
+    if key is not None:
+        _LAST_EDIT_HASH[key] = h
+        _LAST_EDIT_HASH.move_to_end(key)
+        if len(_LAST_EDIT_HASH) > _LAST_EDIT_MAX:
+            _LAST_EDIT_HASH.popitem(last=False)
+
+def _prompt_action(state_key, prompt):
+    """Handler factory for buttons that start a text-reply flow."""
+    async def handler(query, context, session, arg):
+        context.user_data[state_key] = int(arg)
+        await edit_or_skip(query, prompt, reply_markup=CANCEL_MARKUP)
+    return handler
+
+def _toggle_action(flip):
+    """Handler factory for settings toggles: flip one field, commit, redraw."""
+    async def handler(query, context, session, arg):
+        rule = session.get(ForwardRule, int(arg))
+        if rule:
+            flip(rule)
+            session.commit()
+            await edit_or_skip(query, format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
+    return handler
+
+def _view_words_action(attr, del_action, empty_text, title):
+    """Handler factory for the blacklist/whitelist listing screens."""
+    async def handler(query, context, session, arg):
+        rule = session.get(ForwardRule, int(arg))
+        if not rule:
+            await edit_or_skip(query, "Rule nahi mila.")
+            return
+        words = getattr(rule, attr) or []
+        if not words:
+            await edit_or_skip(query, empty_text, reply_markup=rule_settings_keyboard(rule))
+            return
+        buttons = []
+        for w in words:
+            w_enc = urllib.parse.quote_plus(w)
+            buttons.append([InlineKeyboardButton(f"{w}", callback_data="noop")])
+            buttons.append([InlineKeyboardButton("❌ Remove", callback_data=f"{del_action}|{arg}|{w_enc}")])
+        buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=f"settings|{arg}")])
+        await edit_or_skip(query, title, reply_markup=InlineKeyboardMarkup(buttons))
+    return handler
+
+def _del_word_action(attr, label):
+    """Handler factory for removing one blacklist/whitelist word."""
+    async def handler(query, context, session, arg):
+        rid, _, w_enc = arg.partition("|")
+        word = urllib.parse.unquote_plus(w_enc)
+        rule = session.get(ForwardRule, int(rid))
+        if rule:
+            words = getattr(rule, attr) or []
+            if word in words:
+                words.remove(word)
+                setattr(rule, attr, words)
+                session.commit()
+                await edit_or_skip(query, f"{label} '{word}' removed.", reply_markup=rule_settings_keyboard(rule))
+            else:
+                await edit_or_skip(query, "Item not found.", reply_markup=rule_settings_keyboard(rule))
+    return handler
+
+async def _cb_main(query, context, session, arg):
+    await edit_or_skip(query, "Main Menu", reply_markup=main_menu_keyboard())
+
+async def _cb_new_rule(query, context, session, arg):
+    context.user_data["creating_rule"] = {}
+    await edit_or_skip(query, "Send Source Channel ID (e.g. -100123... or @channel)", reply_markup=CANCEL_MARKUP)
+
+async def _cb_list_rules(query, context, session, arg):
+    rules = get_all_rules()
+    if not rules:
+        await edit_or_skip(query, "Koi rule nahi mila.", reply_markup=main_menu_keyboard())
+        return
+    buttons = [[InlineKeyboardButton(f"#{r.id} {r.name}", callback_data=f"rule_open|{r.id}")] for r in rules]
+    buttons.append([InlineKeyboardButton("⬅️ Back", callback_data="main")])
+    await edit_or_skip(query, "Rules:", reply_markup=InlineKeyboardMarkup(buttons))
+
+async def _cb_global_info(query, context, session, arg):
+    await edit_or_skip(query, GLOBAL_INFO_TEXT, reply_markup=main_menu_keyboard())
+
+async def _cb_rule_open(query, context, session, arg):
+    rule = session.get(ForwardRule, int(arg))
+    if not rule:
+        await edit_or_skip(query, "Rule nahi mila.")
+        return
+    await edit_or_skip(query, format_rule_summary(rule), reply_markup=rule_action_keyboard(rule), parse_mode="Markdown")
+
+def _patch_rule(session, rule_id, **fields):
+    """Single-column write via core UPDATE: no row hydration, no JSON decode."""
+    session.execute(update(ForwardRule).where(ForwardRule.id == rule_id).values(**fields))
+    session.commit()
+
+async def _cb_toggle_active(query, context, session, arg):
+    rid = int(arg)
+    current = session.execute(select(ForwardRule.is_active).where(ForwardRule.id == rid)).scalar_one_or_none()
+    if current is None:
+        return
+    new_state = not current
+    _patch_rule(session, rid, is_active=new_state)
+    await edit_or_skip(query, f"Rule #{rid} active={new_state}", reply_markup=_rule_action_markup(rid, new_state))
+
+async def _cb_delete_rule(query, context, session, arg):
+    # single DELETE, no hydration; the after_commit hook drops the rules cache
+    result = session.execute(delete(ForwardRule).where(ForwardRule.id == int(arg)))
+    session.commit()
+    if result.rowcount:
+        await edit_or_skip(query, f"Rule #{arg} deleted.", reply_markup=main_menu_keyboard())
+
+async def _cb_settings(query, context, session, arg):
+    rule = session.get(ForwardRule, int(arg))
+    if rule:
+        await edit_or_skip(query, format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
+
+async def _cb_stats(query, context, session, arg):
+    # narrow select -- no need to hydrate the JSON columns here
+    row = session.execute(
+        select(ForwardRule.id, ForwardRule.is_active, ForwardRule.forwarded_count, ForwardRule.last_triggered)
+        .where(ForwardRule.id == int(arg))
+    ).first()
+    if row:
+        txt = f"Rule #{row.id} Stats:\nForwarded Count: {row.forwarded_count}\nLast Triggered: {row.last_triggered or 'Never'}"
+        await edit_or_skip(query, txt, reply_markup=rule_action_keyboard(row))
+
+async def _cb_export_rule(query, context, session, arg):
+    rule = session.get(ForwardRule, int(arg))
+    if rule:
+        payload = {
+            "id": rule.id,
+            "name": rule.name,
+            "source_chat_id": rule.source_chat_id,
+            "destination_chat_id": rule.destination_chat_id,
+            "is_active": rule.is_active,
+            "block_links": rule.block_links,
+            "block_usernames": rule.block_usernames,
+            "blacklist_words": rule.blacklist_words,
+            "whitelist_words": rule.whitelist_words,
+            "text_replacements": rule.text_replacements,
+            "header_text": rule.header_text,
+            "footer_text": rule.footer_text,
+            "forward_mode": rule.forward_mode,
+            "forward_delay": rule.forward_delay,
+            "schedule_start": rule.schedule_start,
+            "schedule_end": rule.schedule_end,
+        }
+        await edit_or_skip(query, "Export JSON:", reply_markup=BACK_MARKUP)
+        await query.message.reply_text(json.dumps(payload, ensure_ascii=False, indent=2))
+
+async def _cb_view_replace(query, context, session, arg):
+    rule = session.get(ForwardRule, int(arg))
+    if not rule:
+        await edit_or_skip(query, "Rule nahi mila.")
+        return
+    replacements = rule.text_replacements or {}
+    if not replacements:
+        await edit_or_skip(query, "Koi replacement set nahi hai.", reply_markup=rule_settings_keyboard(rule))
+        return
+    # build buttons: each replacement shows delete button
+    buttons = []
+    for find, repl in replacements.items():
+        key_enc = urllib.parse.quote_plus(find)
+        buttons.append([InlineKeyboardButton(f"'{find}' → '{repl}'", callback_data="noop")])
+        buttons.append([InlineKeyboardButton("❌ Delete", callback_data=f"del_replace|{arg}|{key_enc}")])
+    buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=f"settings|{arg}")])
+    await edit_or_skip(query, "Replacements (click Delete to remove):", reply_markup=InlineKeyboardMarkup(buttons))
+
+async def _cb_del_replace(query, context, session, arg):
+    rid, _, key_enc = arg.partition("|")
+    find = urllib.parse.unquote_plus(key_enc)
+    rule = session.get(ForwardRule, int(rid))
+    if rule:
+        replacements = rule.text_replacements or {}
+        if find in replacements:
+            replacements.pop(find)
+            # assign back to ensure DB change tracked (MutableDict usually tracks but reassign to be safe)
+            rule.text_replacements = replacements
+            session.commit()
+            await edit_or_skip(query, f"Replacement '{find}' deleted.", reply_markup=rule_settings_keyboard(rule))
+        else:
+            await edit_or_skip(query, "Replacement not found.", reply_markup=rule_settings_keyboard(rule))
+
+_CALLBACK_HANDLERS = {
+    "main": _cb_main,
+    "refresh": _cb_main,
+    "new_rule": _cb_new_rule,
+    "list_rules": _cb_list_rules,
+    "global_info": _cb_global_info,
+    "rule_open": _cb_rule_open,
+    "toggle_active": _cb_toggle_active,
+    "delete_rule": _cb_delete_rule,
+    "settings": _cb_settings,
+    "stats": _cb_stats,
+    "export_rule": _cb_export_rule,
+    "toggle_links": _toggle_action(lambda r: setattr(r, "block_links", not r.block_links)),
+    "toggle_usernames": _toggle_action(lambda r: setattr(r, "block_usernames", not r.block_usernames)),
+    "set_mode": _toggle_action(lambda r: setattr(r, "forward_mode", "COPY" if r.forward_mode == "FORWARD" else "FORWARD")),
+    "view_replace": _cb_view_replace,
+    "del_replace": _cb_del_replace,
+    "view_blacklist": _view_words_action("blacklist_words", "del_black", "Blacklist empty.", "Blacklist (Remove to delete):"),
+    "del_black": _del_word_action("blacklist_words", "Blacklist item"),
+    "view_whitelist": _view_words_action("whitelist_words", "del_white", "Whitelist empty.", "Whitelist (Remove to delete):"),
+    "del_white": _del_word_action("whitelist_words", "Whitelist item"),
+    "edit_name": _prompt_action("edit_name_rule", "Send new name for the rule:"),
+    "set_delay": _prompt_action("set_delay_rule", "Send delay in seconds (0/5/15/30/60):"),
+    "add_replace": _prompt_action("add_replace_rule", "Send FIND text (case sensitive):"),
+    "add_blacklist": _prompt_action("add_blacklist_rule", "Send word(s) to ADD to blacklist (comma or newline separated):"),
+    "add_whitelist": _prompt_action("add_whitelist_rule", "Send word(s) to ADD to whitelist (comma or newline separated):"),
+    "edit_header": _prompt_action("edit_header_rule", "Send header text (this text will prepend forwarded messages):"),
+    "edit_footer": _prompt_action("edit_footer_rule", "Send footer text (this text will append to forwarded messages):"),
+    "set_schedule": _prompt_action("set_schedule_rule", "Send schedule as START_HH:MM END_HH:MM (Asia/Kolkata 24h) or 'any' to clear. Example: 09:00 21:30"),
+}
+
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -244,307 +860,17 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     data = query.data or ""
-    logger.info(f"Callback data: {data} from {user.id}")
+    # lazy %-args: nothing is formatted when INFO is disabled
+    logger.info("Callback data: %s from %s", data, user.id)
+
+    action, _, arg = data.partition("|")
+    handler = _CALLBACK_HANDLERS.get(action)
+    if handler is None:
+        return  # "noop" and display-only buttons
 
     session = Session()
     try:
-        # simple navigation
-        if data in ("main", "refresh"):
-            await query.edit_message_text("Main Menu", reply_markup=main_menu_keyboard())
-            return
-
-        if data == "new_rule":
-            context.user_data["creating_rule"] = {}
-            await query.edit_message_text("Send Source Channel ID (e.g. -100123... or @channel)", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        if data == "list_rules":
-            rules = session.query(ForwardRule).all()
-            if not rules:
-                await query.edit_message_text("Koi rule nahi mila.", reply_markup=main_menu_keyboard())
-                return
-            buttons = [[InlineKeyboardButton(f"#{r.id} {r.name}", callback_data=f"rule_open|{r.id}")] for r in rules]
-            buttons.append([InlineKeyboardButton("⬅️ Back", callback_data="main")])
-            await query.edit_message_text("Rules:", reply_markup=InlineKeyboardMarkup(buttons))
-            return
-
-        # open rule main
-        if data.startswith("rule_open|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if not rule:
-                await query.edit_message_text("Rule nahi mila.")
-                return
-            await query.edit_message_text(format_rule_summary(rule), reply_markup=rule_action_keyboard(rule), parse_mode="Markdown")
-            return
-
-        # enable/disable
-        if data.startswith("toggle_active|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                rule.is_active = not rule.is_active
-                session.commit()
-                await query.edit_message_text(f"Rule #{rule.id} active={rule.is_active}", reply_markup=rule_action_keyboard(rule))
-            return
-
-        # delete rule
-        if data.startswith("delete_rule|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                session.delete(rule)
-                session.commit()
-                await query.edit_message_text(f"Rule #{rid} deleted.", reply_markup=main_menu_keyboard())
-            return
-
-        # edit name start
-        if data.startswith("edit_name|"):
-            _, rid = data.split("|", 1)
-            context.user_data["edit_name_rule"] = int(rid)
-            await query.edit_message_text("Send new name for the rule:", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # settings open
-        if data.startswith("settings|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                await query.edit_message_text(format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
-            return
-
-        # stats
-        if data.startswith("stats|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                txt = f"Rule #{rule.id} Stats:\nForwarded Count: {rule.forwarded_count}\nLast Triggered: {rule.last_triggered or 'Never'}"
-                await query.edit_message_text(txt, reply_markup=rule_action_keyboard(rule))
-            return
-
-        # export
-        if data.startswith("export_rule|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                payload = {
-                    "id": rule.id,
-                    "name": rule.name,
-                    "source_chat_id": rule.source_chat_id,
-                    "destination_chat_id": rule.destination_chat_id,
-                    "is_active": rule.is_active,
-                    "block_links": rule.block_links,
-                    "block_usernames": rule.block_usernames,
-                    "blacklist_words": rule.blacklist_words,
-                    "whitelist_words": rule.whitelist_words,
-                    "text_replacements": rule.text_replacements,
-                    "header_text": rule.header_text,
-                    "footer_text": rule.footer_text,
-                    "forward_mode": rule.forward_mode,
-                    "forward_delay": rule.forward_delay,
-                    "schedule_start": rule.schedule_start,
-                    "schedule_end": rule.schedule_end,
-                }
-                await query.edit_message_text("Export JSON:", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="main")]]))
-                await query.message.reply_text(json.dumps(payload, ensure_ascii=False, indent=2))
-            return
-
-        # toggle links/usernames
-        if data.startswith("toggle_links|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                rule.block_links = not rule.block_links
-                session.commit()
-                await query.edit_message_text(format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
-            return
-
-        if data.startswith("toggle_usernames|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                rule.block_usernames = not rule.block_usernames
-                session.commit()
-                await query.edit_message_text(format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
-            return
-
-        # toggle mode
-        if data.startswith("set_mode|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                rule.forward_mode = "COPY" if rule.forward_mode == "FORWARD" else "FORWARD"
-                session.commit()
-                await query.edit_message_text(format_rule_summary(rule), reply_markup=rule_settings_keyboard(rule), parse_mode="Markdown")
-            return
-
-        # set delay start
-        if data.startswith("set_delay|"):
-            _, rid = data.split("|", 1)
-            context.user_data["set_delay_rule"] = int(rid)
-            await query.edit_message_text("Send delay in seconds (0/5/15/30/60):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # add replacement start
-        if data.startswith("add_replace|"):
-            _, rid = data.split("|", 1)
-            context.user_data["add_replace_rule"] = int(rid)
-            # ask for FIND text; flow continues in text handler
-            await query.edit_message_text("Send FIND text (case sensitive):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # view replacements -> show list with delete buttons
-        if data.startswith("view_replace|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if not rule:
-                await query.edit_message_text("Rule nahi mila.")
-                return
-            replacements = rule.text_replacements or {}
-            if not replacements:
-                await query.edit_message_text("Koi replacement set nahi hai.", reply_markup=rule_settings_keyboard(rule))
-                return
-            # build buttons: each replacement shows delete button
-            buttons = []
-            for find, repl in replacements.items():
-                key_enc = urllib.parse.quote_plus(find)
-                buttons.append([InlineKeyboardButton(f"'{find}' → '{repl}'", callback_data="noop")])
-                buttons.append([InlineKeyboardButton("❌ Delete", callback_data=f"del_replace|{rid}|{key_enc}")])
-            buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=f"settings|{rid}")])
-            await query.edit_message_text("Replacements (click Delete to remove):", reply_markup=InlineKeyboardMarkup(buttons))
-            return
-
-        # delete replacement callback
-        if data.startswith("del_replace|"):
-            _, rid, key_enc = data.split("|", 2)
-            find = urllib.parse.unquote_plus(key_enc)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                replacements = rule.text_replacements or {}
-                if find in replacements:
-                    replacements.pop(find)
-                    # assign back to ensure DB change tracked (MutableDict usually tracks but reassign to be safe)
-                    rule.text_replacements = replacements
-                    session.commit()
-                    await query.edit_message_text(f"Replacement '{find}' deleted.", reply_markup=rule_settings_keyboard(rule))
-                else:
-                    await query.edit_message_text("Replacement not found.", reply_markup=rule_settings_keyboard(rule))
-            return
-
-        # add blacklist start
-        if data.startswith("add_blacklist|"):
-            _, rid = data.split("|", 1)
-            context.user_data["add_blacklist_rule"] = int(rid)
-            await query.edit_message_text("Send word to ADD to blacklist (single word):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # view blacklist with delete buttons
-        if data.startswith("view_blacklist|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if not rule:
-                await query.edit_message_text("Rule nahi mila.")
-                return
-            bl = rule.blacklist_words or []
-            if not bl:
-                await query.edit_message_text("Blacklist empty.", reply_markup=rule_settings_keyboard(rule))
-                return
-            buttons = []
-            for w in bl:
-                w_enc = urllib.parse.quote_plus(w)
-                buttons.append([InlineKeyboardButton(f"{w}", callback_data="noop")])
-                buttons.append([InlineKeyboardButton("❌ Remove", callback_data=f"del_black|{rid}|{w_enc}")])
-            buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=f"settings|{rid}")])
-            await query.edit_message_text("Blacklist (Remove to delete):", reply_markup=InlineKeyboardMarkup(buttons))
-            return
-
-        # delete blacklist item
-        if data.startswith("del_black|"):
-            _, rid, w_enc = data.split("|", 2)
-            word = urllib.parse.unquote_plus(w_enc)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                bl = rule.blacklist_words or []
-                if word in bl:
-                    bl.remove(word)
-                    rule.blacklist_words = bl
-                    session.commit()
-                    await query.edit_message_text(f"Blacklist item '{word}' removed.", reply_markup=rule_settings_keyboard(rule))
-                else:
-                    await query.edit_message_text("Item not found.", reply_markup=rule_settings_keyboard(rule))
-            return
-
-        # add whitelist start
-        if data.startswith("add_whitelist|"):
-            _, rid = data.split("|", 1)
-            context.user_data["add_whitelist_rule"] = int(rid)
-            await query.edit_message_text("Send word to ADD to whitelist (single word):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # view whitelist
-        if data.startswith("view_whitelist|"):
-            _, rid = data.split("|", 1)
-            rule = session.get(ForwardRule, int(rid))
-            if not rule:
-                await query.edit_message_text("Rule nahi mila.")
-                return
-            wl = rule.whitelist_words or []
-            if not wl:
-                await query.edit_message_text("Whitelist empty.", reply_markup=rule_settings_keyboard(rule))
-                return
-            buttons = []
-            for w in wl:
-                w_enc = urllib.parse.quote_plus(w)
-                buttons.append([InlineKeyboardButton(f"{w}", callback_data="noop")])
-                buttons.append([InlineKeyboardButton("❌ Remove", callback_data=f"del_white|{rid}|{w_enc}")])
-            buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=f"settings|{rid}")])
-            await query.edit_message_text("Whitelist (Remove to delete):", reply_markup=InlineKeyboardMarkup(buttons))
-            return
-
-        # delete whitelist item
-        if data.startswith("del_white|"):
-            _, rid, w_enc = data.split("|", 2)
-            word = urllib.parse.unquote_plus(w_enc)
-            rule = session.get(ForwardRule, int(rid))
-            if rule:
-                wl = rule.whitelist_words or []
-                if word in wl:
-                    wl.remove(word)
-                    rule.whitelist_words = wl
-                    session.commit()
-                    await query.edit_message_text(f"Whitelist item '{word}' removed.", reply_markup=rule_settings_keyboard(rule))
-                else:
-                    await query.edit_message_text("Item not found.", reply_markup=rule_settings_keyboard(rule))
-            return
-
-        # edit header/footer
-        if data.startswith("edit_header|"):
-            _, rid = data.split("|", 1)
-            context.user_data["edit_header_rule"] = int(rid)
-            await query.edit_message_text("Send header text (this text will prepend forwarded messages):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        if data.startswith("edit_footer|"):
-            _, rid = data.split("|", 1)
-            context.user_data["edit_footer_rule"] = int(rid)
-            await query.edit_message_text("Send footer text (this text will append to forwarded messages):", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        # schedule
-        if data.startswith("set_schedule|"):
-            _, rid = data.split("|", 1)
-            context.user_data["set_schedule_rule"] = int(rid)
-            await query.edit_message_text("Send schedule as START_HH:MM END_HH:MM (Asia/Kolkata 24h) or 'any' to clear. Example: 09:00 21:30", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Cancel", callback_data="main")]]))
-            return
-
-        if data == "global_info":
-            await query.edit_message_text(f"Admin: {FORCE_ADMIN_ID}\nDB: {DATABASE_URL}\nTZ: Asia/Kolkata", reply_markup=main_menu_keyboard())
-            return
-
-        # noop for display-only buttons
-        if data == "noop":
-            return
-
+        await handler(query, context, session, arg)
     finally:
         session.close()
 
@@ -640,32 +966,32 @@ async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYP
                 await update.message.reply_text("Replacement saved.", reply_markup=rule_settings_keyboard(rule))
             return
 
-        # Add blacklist word
+        # Add blacklist word(s) -- comma/newline separated input lands in one commit
         if "add_blacklist_rule" in context.user_data:
             rid = context.user_data.pop("add_blacklist_rule")
-            word = text.lower().strip()
             rule = session.get(ForwardRule, int(rid))
             if rule:
                 bl = rule.blacklist_words or []
-                if word not in bl:
-                    bl.append(word)
+                added = _parse_word_list(text, bl)
+                if added:
+                    bl.extend(added)
                     rule.blacklist_words = bl
                     session.commit()
-                await update.message.reply_text("Blacklist updated.", reply_markup=rule_settings_keyboard(rule))
+                await update.message.reply_text(f"Blacklist updated ({len(added)} added).", reply_markup=rule_settings_keyboard(rule))
             return
 
-        # Add whitelist word
+        # Add whitelist word(s)
         if "add_whitelist_rule" in context.user_data:
             rid = context.user_data.pop("add_whitelist_rule")
-            word = text.lower().strip()
             rule = session.get(ForwardRule, int(rid))
             if rule:
                 wl = rule.whitelist_words or []
-                if word not in wl:
-                    wl.append(word)
+                added = _parse_word_list(text, wl)
+                if added:
+                    wl.extend(added)
                     rule.whitelist_words = wl
                     session.commit()
-                await update.message.reply_text("Whitelist updated.", reply_markup=rule_settings_keyboard(rule))
+                await update.message.reply_text(f"Whitelist updated ({len(added)} added).", reply_markup=rule_settings_keyboard(rule))
             return
 
         # Edit header
@@ -722,145 +1048,329 @@ async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         session.close()
 
 # ------------------ Schedule helper ------------------
-def time_in_schedule(start: Optional[str], end: Optional[str]) -> bool:
-    # Uses Asia/Kolkata timezone
-    if not start or not end:
+def time_in_schedule(start_min: Optional[int], end_min: Optional[int], now_min: Optional[int] = None) -> bool:
+    """Pure integer-minute comparison; bounds are pre-parsed on the RuleView."""
+    if start_min is None or end_min is None:
         return True
-    now = datetime.now(KOLKATA_TZ).time()
-    s = datetime.strptime(start, "%H:%M").time()
-    e = datetime.strptime(end, "%H:%M").time()
-    if s <= e:
-        return s <= now <= e
+    if now_min is None:
+        now = datetime.now(KOLKATA_TZ)
+        now_min = now.hour * 60 + now.minute
+    if start_min <= end_min:
+        return start_min <= now_min <= end_min
+    # overnight schedule
+    return now_min >= start_min or now_min <= end_min
+
+# ------------------ Rate limiting ------------------
+class TokenBucket:
+    """Minimal asyncio token bucket: acquire() waits until a token is free."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Telegram caps: ~30 msg/s overall, ~1 msg/s to a single chat.
+GLOBAL_BUCKET = TokenBucket(rate=28, capacity=28)
+_dest_buckets: dict = {}
+
+
+def _dest_bucket(dest) -> TokenBucket:
+    bucket = _dest_buckets.get(dest)
+    if bucket is None:
+        bucket = _dest_buckets[dest] = TokenBucket(rate=1, capacity=3)
+    return bucket
+
+
+# ------------------ Send queue ------------------
+# forward_message only computes what to send and enqueues it; worker
+# coroutines drain the queue so filter CPU work never waits on Telegram I/O.
+SEND_WORKERS = 8
+send_queue: Optional[asyncio.Queue] = None
+
+
+async def start_send_workers(application):
+    global send_queue
+    # 3.12+: start short-lived coroutines eagerly -- most handler awaits
+    # (query.answer, cache hits) complete without ever yielding
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    send_queue = asyncio.Queue()
+    for _ in range(SEND_WORKERS):
+        application.create_task(_send_worker(application.bot))
+
+
+async def _send_worker(bot):
+    while True:
+        task = await send_queue.get()
+        try:
+            await deliver_task(bot, task)
+        finally:
+            send_queue.task_done()
+
+
+async def deliver_task(bot, task):
+    rule = task["rule"]
+    if task.get("delay"):
+        # per-rule delay runs out here, concurrently with other workers,
+        # instead of serializing the whole rule loop
+        await asyncio.sleep(task["delay"])
+    while True:
+        await GLOBAL_BUCKET.acquire()
+        await _dest_bucket(task["dest"]).acquire()
+        try:
+            kind = task["kind"]
+            sent = 1
+            if kind == "copy":
+                await bot.copy_message(chat_id=task["dest"], from_chat_id=task["from_chat"], message_id=task["mid"], caption=task["caption"])
+            elif kind == "text":
+                await bot.send_message(chat_id=task["dest"], text=task["text"])
+            elif kind == "forward_group":
+                mids = sorted(task["mids"])
+                await bot.forward_messages(chat_id=task["dest"], from_chat_id=task["from_chat"], message_ids=mids)
+                sent = len(mids)
+            else:
+                await bot.forward_message(chat_id=task["dest"], from_chat_id=task["from_chat"], message_id=task["mid"])
+            await asyncio.to_thread(record_forward_stats, rule, sent)
+            return
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            logger.error("Forward error for rule %s: %s", rule.id, e)
+            try:
+                await bot.send_message(FORCE_ADMIN_ID, f"Error forwarding for rule {rule.id}: {e}")
+            except Exception:
+                logger.exception("Failed to notify admin")
+            return
+
+
+# ------------------ Album coalescing ------------------
+# Messages of one album (shared media_group_id) arrive as separate updates.
+# In FORWARD mode we buffer them briefly and ship the whole group with a
+# single forwardMessages call. COPY mode still sends per item, since
+# copyMessages can't rewrite captions.
+_album_buffers: dict = {}
+ALBUM_FLUSH_DELAY = 0.5  # seconds
+
+
+async def _flush_album(key, bot):
+    await asyncio.sleep(ALBUM_FLUSH_DELAY)
+    entry = _album_buffers.pop(key, None)
+    if not entry:
+        return
+    task = {"kind": "forward_group", "rule": entry["rule"], "delay": entry["delay"],
+            "dest": entry["dest"], "from_chat": entry["from_chat"], "mids": entry["mids"]}
+    if send_queue is not None:
+        await send_queue.put(task)
     else:
-        # overnight schedule
-        return now >= s or now <= e
+        await deliver_task(bot, task)
+
+
+def _buffer_album_forward(message, rule, delay, application_create_task, bot) -> None:
+    key = (message.chat.id, message.media_group_id, rule.id)
+    entry = _album_buffers.get(key)
+    if entry is not None:
+        entry["mids"].append(message.message_id)
+        return
+    _album_buffers[key] = {"rule": rule, "dest": rule.destination_chat_id, "from_chat": message.chat.id,
+                           "mids": [message.message_id], "delay": delay}
+    application_create_task(_flush_album(key, bot))
+
 
 # ------------------ Forwarding logic ------------------
+# Already-processed messages, keyed by (chat_id, message_id) -- the true
+# unique id, cheaper than hashing content. Bounded LRU so re-delivered
+# updates (restart replays, duplicate webhooks) skip the whole pipeline.
+_seen_messages: "OrderedDict[tuple, None]" = OrderedDict()
+_SEEN_MESSAGES_MAX = 10000
+
+
+def _seen_before(chat_id, message_id) -> bool:
+    key = (chat_id, message_id)
+    if key in _seen_messages:
+        return True
+    _seen_messages[key] = None
+    if len(_seen_messages) > _SEEN_MESSAGES_MAX:
+        _seen_messages.popitem(last=False)
+    return False
+
+
+def record_forward_stats(rule: "RuleView", count: int = 1):
+    """Bump counters with a targeted UPDATE; keeps the rules cache warm."""
+    now = datetime.utcnow()
+    with db_session() as session:
+        session.info["stats_only"] = True
+        session.execute(
+            update(ForwardRule)
+            .where(ForwardRule.id == rule.id)
+            .values(forwarded_count=func.coalesce(ForwardRule.forwarded_count, 0) + count, last_triggered=now)
+        )
+        session.commit()
+    # keep the cached (detached) instance coherent for summaries/stats views
+    rule.forwarded_count = (rule.forwarded_count or 0) + count
+    rule.last_triggered = now
+
+
+# Memoized filter+replace results per (rule_id, text): channels often
+# re-post identical text, and the render is deterministic in both inputs.
+# Bounded, and cleared with the rest of the caches on rule edits.
+_render_cache: OrderedDict = OrderedDict()
+_RENDER_CACHE_MAX = 2048
+
+# shared across rules; per-rule word/replacement patterns live on the RuleView
+USERNAME_RE = re.compile(r"@[a-zA-Z0-9_]+")
+
+
+def render_rule_text(rule: "RuleView", text_to_process: str, text_lower: str):
+    """(final_text, text_modified) after filters/replacements, or None if dropped."""
+    if rule.block_links and (("http" in text_lower) or ("t.me" in text_lower)):
+        return None
+    if rule.block_usernames and USERNAME_RE.search(text_to_process):
+        return None
+    if rule.bl_re and rule.bl_re.search(text_lower):
+        return None
+    if rule.wl_re and not rule.wl_re.search(text_lower):
+        return None
+    if rule.repl_re:
+        final_text, n_subs = rule.repl_re.subn(lambda m: rule.repl_map[m.group(0)], text_to_process)
+        return final_text, n_subs > 0
+    return text_to_process, False
+
+
+def render_rule_text_cached(rule: "RuleView", text_to_process: str, text_lower: str):
+    key = (rule.id, text_to_process)
+    if key in _render_cache:
+        return _render_cache[key]
+    rendered = render_rule_text(rule, text_to_process, text_lower)
+    _render_cache[key] = rendered
+    if len(_render_cache) > _RENDER_CACHE_MAX:
+        _render_cache.popitem(last=False)
+    return rendered
+
+
 async def forward_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.channel_post or update.message
     if message is None:
         return
 
-    session = Session()
-    try:
-        rules: List[ForwardRule] = session.query(ForwardRule).filter(ForwardRule.is_active == True).all()
-        for rule in rules:
-            if not rule.source_chat_id:
-                continue
+    if _seen_before(message.chat.id, message.message_id):
+        return
 
-            # matching (id or @username or contains)
-            matched = False
-            try:
-                msg_chat_id = str(message.chat.id)
-                if rule.source_chat_id.startswith("-100") and msg_chat_id == rule.source_chat_id:
-                    matched = True
-                elif rule.source_chat_id.startswith("@"):
-                    uname = getattr(message.chat, "username", "")
-                    if uname and ("@" + uname).lower() == rule.source_chat_id.lower():
-                        matched = True
-                elif rule.source_chat_id.isdigit() and msg_chat_id == rule.source_chat_id:
-                    matched = True
-                else:
-                    if msg_chat_id in rule.source_chat_id or (getattr(message.chat, "username", "") and ("@" + message.chat.username).lower() in rule.source_chat_id.lower()):
-                        matched = True
-            except Exception:
-                matched = False
+    msg_chat_id = str(message.chat.id)
+    uname = getattr(message.chat, "username", "") or ""
+    msg_uname = ("@" + uname).lower() if uname else ""
 
-            if not matched:
-                continue
+    # text/caption, extracted once per message; empty for pure-media posts,
+    # which then bypass all text-based filtering below
+    text_to_process = message.text or message.caption or ""
+    text_lower = text_to_process.casefold()
 
-            # schedule check
-            if not time_in_schedule(rule.schedule_start, rule.schedule_end):
-                continue
+    # a stale cache rebuild is the only DB hit on this path; run it in a
+    # thread so the event loop keeps serving other updates meanwhile
+    await refresh_rules_cache_async()
 
-            # text/caption
-            text_to_process = message.text or message.caption or ""
-            text_lower = (text_to_process or "").lower()
+    # message-level facts, computed once instead of per matched rule
+    has_media = bool(
+        getattr(message, "photo", None) or getattr(message, "video", None)
+        or getattr(message, "document", None) or getattr(message, "audio", None)
+        or getattr(message, "sticker", None)
+    )
 
-            # filters
-            if rule.block_links and (("http" in text_lower) or ("t.me" in text_lower)):
-                continue
-            if rule.block_usernames and re.search(r"@[a-zA-Z0-9_]+", text_to_process or ""):
+    now_min = None  # clock read deferred until a matched rule has a schedule
+    for rule in get_matching_rules(msg_chat_id, msg_uname):
+        # schedule check (integer minutes, bounds pre-parsed at cache build)
+        if rule.sched_start_min is not None:
+            if now_min is None:
+                now = datetime.now(KOLKATA_TZ)
+                now_min = now.hour * 60 + now.minute
+            if not time_in_schedule(rule.sched_start_min, rule.sched_end_min, now_min):
                 continue
 
-            # blacklist
-            skip = False
-            if rule.blacklist_words:
-                for w in (rule.blacklist_words or []):
-                    if w and w in text_lower:
-                        skip = True
-                        break
-            if skip:
+        if text_to_process:
+            rendered = render_rule_text_cached(rule, text_to_process, text_lower)
+            if rendered is None:
                 continue
+            final_text, text_modified = rendered
+        elif rule.wl_re:
+            # whitelist can never match an empty message
+            continue
+        else:
+            final_text, text_modified = "", False
+
+        # prepend header / append footer (affixes precomputed per rule)
+        if rule.header_prefix or rule.footer_suffix:
+            final_text = "".join((rule.header_prefix, final_text, rule.footer_suffix))
+
+        force_copy = text_modified or (rule.forward_mode == "COPY")
+        delay = rule.forward_delay if rule.forward_delay and rule.forward_delay > 0 else 0
+
+        if force_copy:
+            # media -> copy_message with caption
+            if has_media:
+                task = {"kind": "copy", "rule": rule, "delay": delay, "dest": rule.destination_chat_id, "from_chat": message.chat.id, "mid": message.message_id, "caption": final_text or ""}
+            elif final_text and final_text.strip():
+                task = {"kind": "text", "rule": rule, "delay": delay, "dest": rule.destination_chat_id, "text": final_text}
+            else:
+                continue
+        else:
+            if message.media_group_id:
+                _buffer_album_forward(message, rule, delay, context.application.create_task, context.bot)
+                continue
+            task = {"kind": "forward", "rule": rule, "delay": delay, "dest": rule.destination_chat_id, "from_chat": message.chat.id, "mid": message.message_id}
 
-            # whitelist (must contain at least one)
-            if rule.whitelist_words:
-                ok = False
-                for w in (rule.whitelist_words or []):
-                    if w and w in text_lower:
-                        ok = True
-                        break
-                if not ok:
-                    continue
-
-            # apply replacements
-            final_text = text_to_process
-            text_modified = False
-            if rule.text_replacements and final_text:
-                # iterate over items (make list to avoid runtime mutation issues)
-                for find, repl in list((rule.text_replacements or {}).items()):
-                    if find and find in final_text:
-                        final_text = final_text.replace(find, repl)
-                        text_modified = True
-
-            # prepend header / append footer
-            if rule.header_text:
-                final_text = f"{rule.header_text}\n\n{final_text}"
-            if rule.footer_text:
-                final_text = f"{final_text}\n\n{rule.footer_text}"
-
-            # delay (synchronous)
-            if rule.forward_delay and rule.forward_delay > 0:
-                time.sleep(rule.forward_delay)
-
-            force_copy = text_modified or (rule.forward_mode == "COPY")
-
-            try:
-                if force_copy:
-                    # media -> copy_message with caption
-                    if getattr(message, "photo", None) or getattr(message, "video", None) or getattr(message, "document", None) or getattr(message, "audio", None) or getattr(message, "sticker", None):
-                        caption_to_send = final_text if final_text else ""
-                        await context.bot.copy_message(chat_id=rule.destination_chat_id, from_chat_id=message.chat.id, message_id=message.message_id, caption=caption_to_send)
-                    else:
-                        if final_text and final_text.strip():
-                            await context.bot.send_message(chat_id=rule.destination_chat_id, text=final_text)
-                else:
-                    await context.bot.forward_message(chat_id=rule.destination_chat_id, from_chat_id=message.chat.id, message_id=message.message_id)
-
-                # stats
-                rule.forwarded_count = (rule.forwarded_count or 0) + 1
-                rule.last_triggered = datetime.utcnow()
-                session.commit()
-
-            except Exception as e:
-                logger.error(f"Forward error for rule {rule.id}: {e}")
-                try:
-                    await context.bot.send_message(FORCE_ADMIN_ID, f"Error forwarding for rule {rule.id}: {e}")
-                except Exception:
-                    logger.exception("Failed to notify admin")
-    finally:
-        session.close()
+        if send_queue is not None:
+            await send_queue.put(task)
+        else:
+            # workers not started (e.g. direct invocation) -> deliver inline
+            await deliver_task(context.bot, task)
 
 # ------------------ App setup ------------------
 def main():
-    application = Application.builder().token(BOT_TOKEN).build()
+    # uvloop (Linux/macOS): C event loop, drop-in asyncio replacement
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("uvloop installed as event loop policy")
+    except ImportError:
+        pass
+
+    # enlarged connection pool so concurrent send workers don't block on
+    # acquiring a connection; getUpdates keeps its own small client
+    request = HTTPXRequest(connection_pool_size=64, read_timeout=40, write_timeout=40)
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(request)
+        .get_updates_request(HTTPXRequest(connection_pool_size=2, read_timeout=42))
+        # handlers only classify + enqueue, so updates from different chats
+        # can be processed concurrently; delivery order is kept by the send
+        # queue and album buffering, and the admin menu is single-user
+        .concurrent_updates(True)
+        .post_init(start_send_workers)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CallbackQueryHandler(callback_handler))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_message_handler))
 
-    # watch for all messages (including channel posts)
-    application.add_handler(MessageHandler(filters.ALL, forward_message))
+    # watch for all messages (including channel posts) in a separate handler
+    # group, so the admin text-flow handler above doesn't consume text posts
+    # before the forwarder sees them
+    application.add_handler(MessageHandler(filters.ALL, forward_message), group=1)
 
     PORT = int(os.environ.get("PORT", "8080"))
     WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
@@ -870,7 +1380,10 @@ def main():
         application.run_webhook(listen="0.0.0.0", port=PORT, url_path=BOT_TOKEN, webhook_url=f"{WEBHOOK_URL}/{BOT_TOKEN}")
     else:
         logger.info("Starting polling mode")
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # only update types our handlers consume; no point pulling the rest.
+        # timeout=30 keeps one long-poll connection open instead of the
+        # default 10s cycle, cutting getUpdates request volume ~3x
+        application.run_polling(timeout=30, allowed_updates=["message", "channel_post", "callback_query"])
 
 if __name__ == "__main__":
     main()